@@ -0,0 +1,128 @@
+from struct import error as struct_error
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+
+from .LVRSRC import RSRC, RSRCException
+
+LOAD_RESULT = namedtuple('LOAD_RESULT', [
+    'file',
+    'rsrc',
+    'error'
+])
+
+
+def _load(file):
+    rsrc = RSRC()
+    rsrc.load(file)
+    return rsrc
+
+
+def _resolve(loop, fut, result=None, error=None):
+    ''' Completes an asyncio future from a worker thread, the loop may be closed by then '''
+    def resolve():
+        if fut.done():
+            return
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+    try:
+        loop.call_soon_threadsafe(resolve)
+    except RuntimeError:
+        pass
+
+
+def _start_load(loop, file, executor):
+    ''' Submits loading file to executor, returns Tuple(started, result, finished) futures.
+    finished completes when the worker is free again, also after the result was abandoned.
+    '''
+    started = loop.create_future()
+    finished = loop.create_future()
+
+    def run():
+        _resolve(loop, started)
+        try:
+            return _load(file)
+        finally:
+            _resolve(loop, finished)
+    return started, loop.run_in_executor(executor, run), finished
+
+
+async def _wait_load(started, result, timeout):
+    ''' Awaits a load, timeout counts from when it starts running '''
+    try:
+        await started
+    except asyncio.CancelledError:
+        result.cancel()
+        raise
+    return await asyncio.wait_for(result, timeout)
+
+
+async def load_rsrc(file, executor=None, timeout=None):
+    ''' Loads a resource file (vi, ctl, llb) in executor without blocking the event loop.
+    Raises asyncio.TimeoutError if the load runs longer than timeout seconds, measured from when
+    it starts running, not while it waits for a free executor worker. Threads cannot be
+    interrupted: a timed out load keeps occupying its worker until the read returns, only the
+    result is discarded.
+    '''
+    started, result, _ = _start_load(asyncio.get_running_loop(), file, executor)
+    return await _wait_load(started, result, timeout)
+
+
+async def _load_result(file, executor, timeout, abandon):
+    started, result, finished = _start_load(asyncio.get_running_loop(), file, executor)
+    try:
+        return LOAD_RESULT(file, await _wait_load(started, result, timeout), None)
+    except asyncio.TimeoutError:
+        logging.debug('%s: timed out after %ss', file, timeout)
+        abandon(finished)
+        return LOAD_RESULT(file, None, f'Timed out after {timeout}s')
+    except (OSError, RSRCException, struct_error, UnicodeDecodeError) as e:
+        logging.debug('%s: %s', file, e)
+        return LOAD_RESULT(file, None, str(e))
+
+
+async def load_many(paths, concurrency=8, timeout=None, executor=None, max_abandoned=None):
+    ''' Loads many resource files concurrently. Yields LOAD_RESULT(file, rsrc, error) as they complete.
+    At most concurrency files are in flight and paths is consumed lazily, so a slow consumer
+    holds back new reads (backpressure). Closing or cancelling the iteration cancels pending loads.
+    Without an executor the loads run on a pool of concurrency threads owned by load_many.
+    A load that times out is abandoned but keeps its worker until the read returns, it takes one
+    in flight slot until then. While max_abandoned (default and at most concurrency) loads are
+    abandoned, further files are reported as errors instead of queueing behind hung reads, so the
+    number of threads never grows with the number of paths.
+    '''
+    max_abandoned = concurrency if max_abandoned is None else min(max_abandoned, concurrency)
+    pool = executor if executor is not None else ThreadPoolExecutor(max_workers=concurrency)
+    abandoned = set()
+
+    def abandon(finished):
+        abandoned.add(finished)
+        finished.add_done_callback(abandoned.discard)
+
+    pending = set()
+    paths = iter(paths)
+    try:
+        while True:
+            # Abandoned loads hold their workers, only start a load where a worker is free
+            while len(abandoned) >= max_abandoned or len(pending) + len(abandoned) < concurrency:
+                file = next(paths, None)
+                if file is None:
+                    break
+                if len(abandoned) >= max_abandoned:
+                    logging.debug('%s: not loaded, %d timed out loads still running', file, len(abandoned))
+                    yield LOAD_RESULT(file, None, f'Not loaded, {len(abandoned)} timed out loads still running')
+                    continue
+                pending.add(asyncio.ensure_future(_load_result(file, pool, timeout, abandon)))
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
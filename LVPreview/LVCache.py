@@ -0,0 +1,120 @@
+from collections import namedtuple, OrderedDict
+import threading
+import os
+
+from .LVRSRC import RSRC
+
+CACHE_STATS = namedtuple('CACHE_STATS', [
+    'hits',
+    'misses',
+    'evictions',
+    'entries',
+    'size',
+    'max_size',
+    'hit_rate'
+])
+
+CACHE_ENTRY = namedtuple('CACHE_ENTRY', [
+    'stamp',
+    'size',
+    'rsrc'
+])
+
+
+def _stamp(file):
+    st = os.stat(file)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class RSRCCache:
+    ''' Shared cache of parsed RSRC objects keyed by absolute path.
+    Entries are validated against (mtime, size, inode) on every get and evicted
+    least recently used first once the total size of cached files exceeds max_size bytes.
+    Cached RSRC objects are shared between callers and must not be modified.
+    '''
+    def __init__(self, max_size=256 * 1024 * 1024):
+        self._max_size = max_size
+        self._size = 0
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    # Accessors
+    def get_stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return CACHE_STATS(
+                self._hits,
+                self._misses,
+                self._evictions,
+                len(self._entries),
+                self._size,
+                self._max_size,
+                self._hits / lookups if lookups else 0.0
+            )
+
+    # Functions
+    def get(self, file):
+        ''' Returns the parsed RSRC for file, loading it on a miss or when the file changed on disk '''
+        file = os.path.abspath(file)
+        if not os.path.exists(file):
+            raise FileNotFoundError(f'Unable to resolve file path: {file}')
+        stamp = _stamp(file)
+
+        with self._lock:
+            entry = self._entries.get(file)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(file)
+                self._hits += 1
+                return entry.rsrc
+            self._misses += 1
+
+        # Parse outside the lock, concurrent misses of different files don't serialize
+        rsrc = RSRC()
+        rsrc.load(file)
+        size = stamp[1]
+
+        with self._lock:
+            self._remove(file)
+            if size <= self._max_size:
+                self._entries[file] = CACHE_ENTRY(stamp, size, rsrc)
+                self._size += size
+                while self._size > self._max_size:
+                    self._remove(next(iter(self._entries)))
+                    self._evictions += 1
+        return rsrc
+
+    def invalidate(self, file=None):
+        ''' Drops file from the cache, or every entry when file is None '''
+        with self._lock:
+            if file is None:
+                self._entries.clear()
+                self._size = 0
+            else:
+                self._remove(os.path.abspath(file))
+
+    def resize(self, max_size):
+        with self._lock:
+            self._max_size = max_size
+            while self._size > self._max_size:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, file):
+        entry = self._entries.pop(file, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+_cache = RSRCCache()
+
+
+def load_cached(file):
+    ''' Loads a resource file (vi, ctl, llb) through the shared cache '''
+    return _cache.get(file)
+
+
+def get_cache():
+    return _cache
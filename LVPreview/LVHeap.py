@@ -0,0 +1,207 @@
+from struct import unpack_from
+from collections import Counter
+import argparse
+import zlib
+
+from .LVRSRC import RSRC, RSRCException
+
+# Heap entry scopes
+HEAP_OPEN = 0
+HEAP_LEAF = 1
+HEAP_CLOSE = 2
+
+# System attribute ids
+HEAP_ATTR_UID = -2
+HEAP_ATTR_FLAGS = -3
+HEAP_ATTR_CLASS = -5
+
+# Heap blocks (front panel, block diagram)
+HEAP_BLOCKS = ('FPHb', 'BDHb')
+
+_NO_ATTRS = ()
+
+
+def iter_heap(block, chunk_size=64 * 1024):
+    ''' Decodes a heap block ('FPHb', 'BDHb') into a stream of tag events without building a tree.
+    The block is inflated chunk by chunk while events are pulled, so stopping early skips the rest.
+    Yields Tuple(scope, tag, attrs, content):
+      scope   HEAP_OPEN, HEAP_LEAF (open + close) or HEAP_CLOSE
+      tag     tag id
+      attrs   Tuple((id, value), ...) or () (class in HEAP_ATTR_CLASS, uid in HEAP_ATTR_UID)
+      content bytes or b''
+    '''
+    if block is None or len(block) < 4:
+        raise RSRCException('Heap invalid or corrupt. Block is empty.')
+    src = memoryview(block)[4:]
+    dec = zlib.decompressobj() if len(src) and src[0] == 0x78 else None
+    src_pos = 0
+    buf = b'' if dec is not None else bytes(src)
+    pos = 0
+    consumed = 0
+
+    def more():
+        nonlocal src_pos
+        if dec.unconsumed_tail:
+            return dec.decompress(dec.unconsumed_tail, chunk_size)
+        if src_pos < len(src):
+            src_pos = src_pos + chunk_size
+            return dec.decompress(src[src_pos - chunk_size:src_pos], chunk_size)
+        return None
+
+    def need(n):
+        ''' Inflates until n bytes are buffered, dropping the bytes already parsed '''
+        nonlocal buf, pos, consumed
+        while len(buf) - pos < n:
+            data = more() if dec is not None else None
+            if data is None:
+                raise RSRCException('Heap invalid or corrupt. Unexpected end of heap.')
+            consumed = consumed + pos
+            buf = buf[pos:] + data
+            pos = 0
+
+    # Read HEAP_LENGTH
+    need(4)
+    remaining, = unpack_from('>I', buf, pos)
+    pos = pos + 4
+    end = consumed + pos + remaining
+
+    while consumed + pos < end:
+        # Read CMD = size spec(3) | has attrs(1) | scope(2) | tag(10)
+        need(2)
+        cmd = (buf[pos] << 8) | buf[pos + 1]
+        pos = pos + 2
+        tag = cmd & 0x3FF
+        if tag == 0x3FF:
+            need(4)
+            tag, = unpack_from('>i', buf, pos)
+            pos = pos + 4
+
+        attrs = _NO_ATTRS
+        if cmd & 0x1000:
+            # Read ATTR_COUNT (U124) + ATTRs = id (S124) | value (S24)
+            need(1)
+            count = buf[pos]
+            pos = pos + 1
+            if count == 0xFF:
+                need(2)
+                count, = unpack_from('>H', buf, pos)
+                pos = pos + 2
+            attrs = []
+            for _ in range(count):
+                need(3)
+                atid, = unpack_from('>b', buf, pos)
+                pos = pos + 1
+                if atid == -128:
+                    need(6)
+                    atid, = unpack_from('>i', buf, pos)
+                    pos = pos + 4
+                atval, = unpack_from('>h', buf, pos)
+                pos = pos + 2
+                if atval == -32768:
+                    need(4)
+                    atval, = unpack_from('>i', buf, pos)
+                    pos = pos + 4
+                attrs.append((atid, atval))
+            attrs = tuple(attrs)
+
+        # Read CONTENT, size spec 1-4 = fixed, 6 = U124 length, 0/7 = none
+        size = cmd >> 13
+        if size == 6:
+            need(1)
+            size = buf[pos]
+            pos = pos + 1
+            if size == 0xFF:
+                need(2)
+                size, = unpack_from('>H', buf, pos)
+                pos = pos + 2
+                if size == 0xFFFF:
+                    need(4)
+                    size, = unpack_from('>I', buf, pos)
+                    pos = pos + 4
+        elif size == 7:
+            size = 0
+        elif size == 5:
+            raise RSRCException(f'Heap invalid or corrupt. Unsupported size spec 5 for tag {tag}.')
+        content = b''
+        if size:
+            need(size)
+            content = buf[pos:pos + size]
+            pos = pos + size
+
+        scope = (cmd >> 10) & 0x3
+        if scope == 3:
+            raise RSRCException(f'Heap invalid or corrupt. Unknown scope for tag {tag}.')
+        yield (scope, tag, attrs, content)
+
+
+def get_class(attrs):
+    for atid, atval in attrs:
+        if atid == HEAP_ATTR_CLASS:
+            return atval
+    return None
+
+
+def count_nodes(block):
+    ''' Counts the objects (opened and leaf tags) in a heap block '''
+    return sum(1 for scope, _, _, _ in iter_heap(block) if scope != HEAP_CLOSE)
+
+
+def find_classes(block, classes):
+    ''' Yields Tuple(depth, tag, attrs) of every object whose class id is in classes '''
+    classes = set(classes)
+    depth = 0
+    for scope, tag, attrs, _ in iter_heap(block):
+        if attrs and get_class(attrs) in classes:
+            yield depth, tag, attrs
+        if scope == HEAP_OPEN:
+            depth = depth + 1
+        elif scope == HEAP_CLOSE:
+            depth = depth - 1
+
+
+def heap_stats(rsrc):
+    ''' Returns dict(block name, Tuple(nodes, max depth, Counter(class id))) for the heaps of a loaded RSRC '''
+    stats = {}
+    for name in HEAP_BLOCKS:
+        block = rsrc.get_block_data(name)
+        if block is None:
+            continue
+        nodes = 0
+        depth = 0
+        max_depth = 0
+        classes = Counter()
+        for scope, _, attrs, _ in iter_heap(block):
+            if scope == HEAP_CLOSE:
+                depth = depth - 1
+                continue
+            nodes = nodes + 1
+            if attrs:
+                classes[get_class(attrs)] += 1
+            if scope == HEAP_OPEN:
+                depth = depth + 1
+                max_depth = max(max_depth, depth)
+        stats[name] = (nodes, max_depth, classes)
+    return stats
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='Front panel / block diagram heap metrics')
+
+    parser.add_argument('files', help='Resource files to scan', nargs='+')
+
+    args = parser.parse_args()
+
+    for file in args.files:
+        rsrc = RSRC()
+        try:
+            rsrc.load(file)
+            stats = heap_stats(rsrc)
+        except (OSError, RSRCException, zlib.error) as e:
+            print(f'error {file}: {e}')
+            continue
+        line = ' '.join(f'{name}:{nodes}/{depth}' for name, (nodes, depth, _) in stats.items())
+        print(f'{line} {file}')
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,177 @@
+from struct import error as struct_error
+from collections import namedtuple
+from operator import mul
+import argparse
+import logging
+import math
+
+from .LVRSRC import RSRC, RSRCException
+from .LVBmp import COLOR_TABLE_8BIT, COLOR_TABLE_4BIT, COLOR_TABLE_1BIT
+from .LVVersion import iter_rsrc_files
+
+ICON_MATCH = namedtuple('ICON_MATCH', [
+    'distance',
+    'hash',
+    'item'
+])
+
+# Icon blocks by preference, all 32x32 (8-bit, 4-bit and 1-bit color)
+ICON_BLOCKS = ('icl8', 'icl4', 'ICON')
+ICON_SIZE = 32
+# Files with an icon of their own
+ICON_EXTS = ('.vi', '.vit', '.ctl', '.vim')
+HASH_SIZE = 8
+
+
+def _gray(color):
+    return (((color >> 16) & 0xFF) * 299 + ((color >> 8) & 0xFF) * 587 + (color & 0xFF) * 114) / 1000.0
+
+# Gray level per palette index, decoding an icon is a table lookup per pixel
+GRAY_8BIT = [_gray(c) for c in COLOR_TABLE_8BIT]
+GRAY_4BIT = [_gray(c) for c in COLOR_TABLE_4BIT]
+GRAY_1BIT = [_gray(c) for c in COLOR_TABLE_1BIT]
+
+# Low frequency rows of the 32 point DCT-II basis
+DCT_BASIS = [
+    [math.cos(math.pi * (2 * x + 1) * u / (2 * ICON_SIZE)) for x in range(ICON_SIZE)]
+    for u in range(HASH_SIZE)
+]
+
+
+def icon_gray(name, data):
+    ''' Decodes an icon block to 1024 gray levels (row major, 32x32) '''
+    if name == 'icl8' and len(data) >= 1024:
+        return [GRAY_8BIT[v] for v in data[:1024]]
+    if name == 'icl4' and len(data) >= 512:
+        return [GRAY_4BIT[n] for v in data[:512] for n in (v >> 4, v & 0x0F)]
+    if name == 'ICON' and len(data) >= 128:
+        return [GRAY_1BIT[(v >> (7 - b)) & 1] for v in data[:128] for b in range(8)]
+    raise RSRCException(f'Icon invalid or corrupt. Block {name} has {len(data)} bytes.')
+
+
+def get_icon(rsrc):
+    ''' Returns Tuple(name, data) of the richest icon block of a loaded RSRC, or None '''
+    for name in ICON_BLOCKS:
+        data = rsrc.get_block_data(name)
+        if data is not None:
+            return name, data
+    return None
+
+
+def phash(gray):
+    ''' 64-bit perceptual hash of a 32x32 gray icon.
+    Separable DCT keeping the 8x8 lowest frequencies, each bit set where the coefficient
+    is above the median (DC term excluded from the median).
+    '''
+    # Rows: 32 rows x 8 coefficients, dot products run in C through map/sum
+    rows = [gray[y * ICON_SIZE:(y + 1) * ICON_SIZE] for y in range(ICON_SIZE)]
+    row_dct = [[sum(map(mul, basis, row)) for basis in DCT_BASIS] for row in rows]
+    # Columns: 8 x 8 coefficients
+    cols = list(zip(*row_dct))
+    coeffs = [sum(map(mul, basis, col)) for basis in DCT_BASIS for col in cols]
+    median = sorted(coeffs[1:])[(len(coeffs) - 1) // 2]
+    h = 0
+    for c in coeffs:
+        h = (h << 1) | (c > median)
+    return h
+
+
+def phash_batch(icons):
+    ''' Hashes many icons, a List(Tuple(name, data)). Returns List(hash) in order. '''
+    return [phash(icon_gray(name, data)) for name, data in icons]
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class IconIndex:
+    ''' BK-tree over 64-bit icon hashes with Hamming distance.
+    Searching within distance k only visits subtrees whose edge distance lies in [d - k, d + k],
+    so near-duplicate lookups stay sublinear in the number of icons.
+    '''
+    def __init__(self):
+        # node = [hash, items, dict(distance, node)]
+        self._root = None
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, h, item):
+        self._count += 1
+        if self._root is None:
+            self._root = [h, [item], {}]
+            return
+        node = self._root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [item], {}]
+                return
+            node = child
+
+    def search(self, h, k):
+        ''' Returns List(ICON_MATCH) of every item within Hamming distance k, nearest first '''
+        matches = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= k:
+                matches += [ICON_MATCH(d, node[0], item) for item in node[1]]
+            for dist, child in node[2].items():
+                if d - k <= dist <= d + k:
+                    stack.append(child)
+        return sorted(matches, key=lambda m: m[0])
+
+
+def index_files(files):
+    ''' Builds an IconIndex of the icons of resource files (vi, ctl).
+    Returns Tuple(index, dict(file, hash), List(Tuple(file, error))), a bad file only skips itself.
+    '''
+    index = IconIndex()
+    hashes = {}
+    errors = []
+    for file in files:
+        rsrc = RSRC()
+        try:
+            rsrc.load(file)
+            icon = get_icon(rsrc)
+            if icon is None:
+                continue
+            h = phash(icon_gray(*icon))
+        except (OSError, RSRCException, struct_error) as e:
+            logging.debug('%s: %s', file, e)
+            errors.append((file, str(e)))
+            continue
+        index.add(h, file)
+        hashes[file] = h
+    return index, hashes, errors
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='Find near-duplicate LabVIEW icons')
+
+    parser.add_argument('paths', help='Files or directories to scan', nargs='+')
+    parser.add_argument('-k', '--distance', type=int, default=4, help='Maximum Hamming distance')
+
+    args = parser.parse_args()
+
+    index, hashes, errors = index_files(iter_rsrc_files(args.paths, ICON_EXTS))
+    for file, error in errors:
+        print(f'error {file}: {error}')
+    for file, h in hashes.items():
+        similar = [m for m in index.search(h, args.distance) if m.item != file]
+        if similar:
+            print(f'{h:016x} {file}')
+            for m in similar:
+                print(f'  {m.distance:>2} {m.item}')
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,209 @@
+from collections import namedtuple
+import threading
+import argparse
+import logging
+import json
+import mmap
+import zlib
+import os
+
+from .LVRSRC import RSRC, RSRCException
+
+PACK_BLOCK = namedtuple('PACK_BLOCK', [
+    'file',
+    'name',
+    'index',
+    'offset',
+    'length',
+    'size',
+    'codec',
+    'crc32'
+])
+
+PACK_FILE = namedtuple('PACK_FILE', [
+    'file',
+    'rsrc_type',
+    'rsrc_creator',
+    'filenames'
+])
+
+# Heap blocks are already zlib compressed by LabVIEW, compressing again only costs time
+PACK_RAW_BLOCKS = ('FPHb', 'BDHb', 'FPHc', 'BDHc', 'VCTP')
+
+# zlib level per block type, anything else uses the default level passed to RSRCPack
+PACK_LEVELS = {'icl8': 9, 'icl4': 9, 'ICON': 9}
+
+
+class RSRCPack:
+    ''' Single-file packed export of the blocks of many resource files (vi, ctl, llb).
+    <path>.dat is an append-only file of block payloads, zlib compressed per block type,
+    and <path>.idx holds one JSON record per file/block pointing into it. Blocks are read
+    back at random through an mmap of the data file and verified against their crc32.
+    Adding a file again appends new records that shadow the old ones.
+    '''
+    def __init__(self, path, mode='r', level=6):
+        if mode not in ('r', 'a'):
+            raise ValueError(f'Invalid pack mode: {mode}')
+        self._path = os.path.abspath(path)
+        self._mode = mode
+        self._level = level
+        self._files = {}
+        self._blocks = {}
+        self._mmap = None
+        self._lock = threading.Lock()
+        self._data = open(self._path + '.dat', mode='rb' if mode == 'r' else 'ab+')
+        torn = self._read_index()
+        self._index = None if mode == 'r' else open(self._path + '.idx', mode='a', encoding='utf-8')
+        if self._index is not None and torn:
+            self._index.write('\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Accessors, safe to call while other threads add files
+    def get_files(self):
+        with self._lock:
+            return list(self._files)
+
+    def get_file(self, file):
+        with self._lock:
+            return self._files.get(file)
+
+    def get_block_names(self, file):
+        with self._lock:
+            return list(self._blocks.get(file, {}))
+
+    def get_block(self, file, name, index=0):
+        with self._lock:
+            return self._blocks.get(file, {}).get((name, index))
+
+    def get_block_data(self, file, name, index=0):
+        with self._lock:
+            b = self._blocks.get(file, {}).get((name, index))
+            if b is None:
+                return None
+            # Copy out under the lock, a concurrent add may remap (and close) the current mmap
+            data = self._map(b.offset + b.length)[b.offset:b.offset + b.length]
+        if b.codec == 'zlib':
+            data = zlib.decompress(data)
+        if len(data) != b.size or zlib.crc32(data) != b.crc32:
+            raise RSRCException(f'Pack invalid or corrupt. Block {b.name}.{b.index} of {file} failed crc check.')
+        return data
+
+    # Functions
+    def add(self, rsrc, file=None):
+        ''' Appends every block of a loaded RSRC '''
+        if self._index is None:
+            raise RSRCException(f'Pack {self._path} is opened read only.')
+        file = file or rsrc.get_file()
+        hdr = rsrc.get_header()
+        records = [{
+            'file': file,
+            'rsrc_type': hdr.rsrc_type.decode('utf-8', errors='replace'),
+            'rsrc_creator': hdr.rsrc_creator.decode('utf-8', errors='replace'),
+            'filenames': rsrc.get_filenames()
+        }]
+
+        # Compress outside the lock, concurrent adds only serialize on the appends
+        blocks = []
+        for name, index in rsrc.get_block_names():
+            data = bytes(rsrc.get_block_data(name, index))
+            stored, codec = data, 'raw'
+            if name not in PACK_RAW_BLOCKS:
+                packed = zlib.compress(data, PACK_LEVELS.get(name, self._level))
+                if len(packed) < len(data):
+                    stored, codec = packed, 'zlib'
+            blocks.append((name, index, stored, len(data), codec, zlib.crc32(data)))
+
+        with self._lock:
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            for name, index, stored, size, codec, crc in blocks:
+                self._data.write(stored)
+                records.append(PACK_BLOCK(file, name, index, offset, len(stored), size, codec, crc)._asdict())
+                offset = offset + len(stored)
+
+            # Data first, then index, a crash never leaves index records pointing past the data
+            self._data.flush()
+            self._index.write(''.join(json.dumps(r) + '\n' for r in records))
+            self._index.flush()
+            for r in records:
+                self._add_record(r)
+
+    def add_file(self, file):
+        rsrc = RSRC()
+        rsrc.load(file)
+        self.add(rsrc)
+
+    def extract(self, file, dest_dir):
+        ''' Writes the blocks of file as one file per block, like RSRC.export_blocks '''
+        dest_dir = os.path.abspath(dest_dir)
+        if not os.path.isdir(dest_dir):
+            os.makedirs(dest_dir)
+        for name, index in self.get_block_names(file):
+            with open(os.path.join(dest_dir, f'{name}-{index}'), mode='wb') as f:
+                f.write(self.get_block_data(file, name, index))
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            self._data.close()
+
+    def _read_index(self):
+        ''' Loads the index, returns True if its last record was torn by an interrupted append '''
+        if not os.path.exists(self._path + '.idx'):
+            return False
+        line = '\n'
+        with open(self._path + '.idx', mode='r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    self._add_record(json.loads(line))
+                except ValueError:
+                    logging.debug('Skipping invalid pack index record: %r', line)
+        return not line.endswith('\n')
+
+    def _add_record(self, r):
+        if 'name' in r:
+            b = PACK_BLOCK(**r)
+            self._blocks.setdefault(b.file, {})[(b.name, b.index)] = b
+        else:
+            # A new file record replaces every block of an older copy
+            self._files[r['file']] = PACK_FILE(**r)
+            self._blocks[r['file']] = {}
+
+    def _map(self, end):
+        ''' Returns an mmap covering end bytes of the data file, callers hold the lock '''
+        if self._mmap is None or len(self._mmap) < end:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._data.flush()
+            self._mmap = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='Pack the blocks of LabVIEW resource files into one file')
+
+    parser.add_argument('pack', help='Pack path (writes <pack>.dat and <pack>.idx)')
+    parser.add_argument('files', help='Resource files to add', nargs='+')
+
+    args = parser.parse_args()
+
+    with RSRCPack(args.pack, mode='a') as pack:
+        for file in args.files:
+            try:
+                pack.add_file(file)
+            except (OSError, RSRCException) as e:
+                print(f'error {file}: {e}')
+
+
+if __name__ == '__main__':
+    cli()
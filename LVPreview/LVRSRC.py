@@ -41,11 +41,24 @@ BLOCK = namedtuple('BLOCK', [
     'data_offset'
 ])
 
+def _check_range(size, offset, length, what):
+    ''' Validates offset/length against the buffer size before slicing '''
+    if offset < 0 or length < 0 or offset + length > size:
+        raise RSRCException(f'RSRC invalid or corrupt. {what} at offset {offset} (size {length}) exceeds file size {size}.')
+
+def _decode_text(b):
+    ''' Text is saved in the system code page, most often Windows-1252 '''
+    try:
+        return b.decode('utf-8')
+    except UnicodeDecodeError:
+        return b.decode('cp1252', errors='replace')
+
 class RSRC:
     def __init__(self):
         self._file = None
         self._header = None
         self._blocks = []
+        self._block_index = {}
         self._filenames = []
 
     # Accessors
@@ -59,10 +72,11 @@ class RSRC:
         return [(b.name, b.index) for b in self._blocks]
     
     def get_block(self, name, index=0):
-        return next((b for b in self._blocks if b.name == name and (index == 0 or b.index == index)), None)
+        return self._block_index.get((name, index))
     
     def get_block_data(self, name, index=0):
-        return next((b.data for b in self._blocks if b.name == name and (index == 0 or b.index == index)), None)
+        b = self._block_index.get((name, index))
+        return None if b is None else b.data
 
     def get_filenames(self):
         return self._filenames
@@ -73,12 +87,20 @@ class RSRC:
         if not os.path.exists(file):
             raise FileNotFoundError(f'Unable to resolve file path: {file}')
 
-        self._file = file
         rsrc = b''
-        with open(self._file, mode='rb') as f:
+        with open(file, mode='rb') as f:
             rsrc = f.read()
+        self.loads(rsrc, file)
+
+    def loads(self, rsrc, file=None):
+        ''' Loads a resource file (vi, ctl, llb) from a bytes-like buffer.
+        Block data of a memoryview buffer (e.g. mmap) are views into it, not copies.
+        '''
+        self._file = file
+        rsize = len(rsrc)
         
         # Read RSRC_HEADER_1
+        _check_range(rsize, 0, 32, 'RSRC header')
         hdr1 = RSRC_HEADER(*(unpack('>6sH4s4sIIII', rsrc[
             0:
             32
@@ -86,6 +108,7 @@ class RSRC:
         logging.debug(hdr1)
         
         # Read RSRC_HEADER_2
+        _check_range(rsize, hdr1.info_offset, 32 + 20, 'RSRC info header')
         hdr2 = RSRC_HEADER(*(unpack('>6sH4s4sIIII', rsrc[
                 hdr1.info_offset :
                 hdr1.info_offset + 32
@@ -104,18 +127,21 @@ class RSRC:
         logging.debug(info1)
 
         # Read BLOCK_COUNT
+        _check_range(rsize, hdr1.info_offset + info1.offset, 4, 'Block count')
         block_cnt, = unpack('>I', rsrc[
             hdr1.info_offset + info1.offset : 
             hdr1.info_offset + info1.offset + 4
         ])
         block_cnt = int(block_cnt) + 1
         logging.debug('block_cnt=%s', block_cnt)
-        if block_cnt > 1000:
-            raise RSRCException(f'RSRC invalid or corrupt. Block count limit exceeded {block_cnt}.')
+        # The BLOCK_ID list must fit in the file, bounding the work by the real content
+        _check_range(rsize, hdr1.info_offset + info1.offset + 4, block_cnt * 12, f'Block list of {block_cnt} blocks')
 
         # Read BLOCKs
         fnames_offset = 0
+        info_cnt = 0
         self._blocks = []
+        self._block_index = {}
         bid_offset = hdr1.info_offset + info1.offset + 4
         
         for i in range(block_cnt):
@@ -127,8 +153,14 @@ class RSRC:
                 bid_offset + 12
             ])))
             logging.debug(bid)
+            name = _decode_text(bid.name)
             
             binfo_offset = hdr1.info_offset + info1.offset + bid.offset
+            _check_range(rsize, binfo_offset, (int(bid.count) + 1) * 20, f'Block {name} info list')
+            # BLOCK_INFOs never share bytes, more of them than fit in the file means overlapping lists
+            info_cnt = info_cnt + int(bid.count) + 1
+            if info_cnt * 20 > rsize:
+                raise RSRCException(f'RSRC invalid or corrupt. Block info count {info_cnt} exceeds file size {rsize}.')
 
             for bidx in range(int(bid.count) + 1):
                 logging.debug('--Block %s count %s--', i, bidx)
@@ -142,17 +174,19 @@ class RSRC:
                 
                 # Read BLOCK_DATA_LENGTH
                 bdata_offset = hdr1.data_offset + binfo.offset
+                _check_range(rsize, bdata_offset, 4, f'Block {name}.{bidx} length')
                 blen, = unpack('>I', rsrc[
                     bdata_offset :
                     bdata_offset + 4
                 ])
                 logging.debug('block_length=%s', blen)
+                _check_range(rsize, bdata_offset + 4, int(blen), f'Block {name}.{bidx} data')
 
                 # Append block
                 self._blocks.append(
                     # Read BLOCK_DATA
                     BLOCK(
-                        bid.name.decode('utf-8'),
+                        name,
                         bidx,
                         rsrc[
                             bdata_offset + 4 :
@@ -163,6 +197,7 @@ class RSRC:
                         bdata_offset
                     )
                 )
+                self._block_index.setdefault((self._blocks[-1].name, bidx), self._blocks[-1])
 
                 # Find fnames offset
                 fnames_offset = max(
@@ -178,7 +213,7 @@ class RSRC:
             bid_offset = bid_offset + 12
             
         # Read filenames at end
-        fremaining = len(rsrc[fnames_offset:])
+        fremaining = max(0, rsize - fnames_offset)
         logging.debug('fnames_offset=%s, fnames_remaining=%s', fnames_offset, fremaining)
         self._filenames = []
         foffset = 0
@@ -191,6 +226,7 @@ class RSRC:
             ])
             
             # Read FILENAME
+            _check_range(rsize, fnames_offset + foffset + 1, flength, 'Filename')
             fname, = unpack(f'{flength}s', rsrc[
                 fnames_offset + foffset + 1 :
                 fnames_offset + foffset + 1 + flength
@@ -199,7 +235,7 @@ class RSRC:
 
             # Append filename
             self._filenames.append(
-                fname.decode('utf-8')
+                _decode_text(fname)
             )
         logging.debug(self._filenames)
 
@@ -221,4 +257,141 @@ class RSRC:
         
         file = os.path.join(dest_dir, '_filenames.txt')
         with open(file, mode='w') as f:
-            f.write("\n".join(self._filenames))
\ No newline at end of file
+            f.write("\n".join(self._filenames))
+
+def _is_seekable(fileobj):
+    try:
+        return fileobj.seekable()
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def _read_exact(fileobj, size):
+    ''' Reads exactly size bytes, streams (pipes, sockets) may return short reads '''
+    chunks = []
+    while size > 0:
+        chunk = fileobj.read(size)
+        if not chunk:
+            raise RSRCException('RSRC invalid or corrupt. Unexpected end of stream.')
+        chunks.append(chunk)
+        size = size - len(chunk)
+    return b''.join(chunks)
+
+
+def _skip(fileobj, size, chunk_size=64 * 1024):
+    ''' Discards size bytes of a non-seekable stream without keeping them '''
+    while size > 0:
+        size = size - len(_read_exact(fileobj, min(size, chunk_size)))
+
+
+def _parse_directory(hdr1, info):
+    ''' Parses the block directory from the info section (starting at hdr1.info_offset)
+    Returns a List(Tuple(name, index, id_offset, info_offset, data_offset)) with absolute offsets
+    '''
+    isize = len(info)
+    _check_range(isize, 0, 32 + 20, 'RSRC info header')
+    hdr2 = RSRC_HEADER(*(unpack('>6sH4s4sIIII', info[0:32])))
+    if hdr1 != hdr2:
+        raise RSRCException(f'RSRC invalid or corrupt. RSRC Headers are not identical at offset {hdr1.info_offset}.')
+
+    # Read BLOCK_INFO_LIST
+    info1 = RSRC_INFO(*(unpack('>iiiII', info[32:52])))
+
+    # Read BLOCK_COUNT
+    _check_range(isize, info1.offset, 4, 'Block count')
+    block_cnt, = unpack('>I', info[info1.offset:info1.offset + 4])
+    block_cnt = int(block_cnt) + 1
+    _check_range(isize, info1.offset + 4, block_cnt * 12, f'Block list of {block_cnt} blocks')
+
+    entries = []
+    bid_offset = info1.offset + 4
+    for i in range(block_cnt):
+        # Read BLOCK_ID
+        bid = BLOCK_ID(*(unpack('>4sII', info[bid_offset:bid_offset + 12])))
+        name = _decode_text(bid.name)
+        binfo_offset = info1.offset + bid.offset
+        _check_range(isize, binfo_offset, (int(bid.count) + 1) * 20, f'Block {name} info list')
+        if (len(entries) + int(bid.count) + 1) * 20 > isize:
+            raise RSRCException(f'RSRC invalid or corrupt. Block info count exceeds info size {isize}.')
+        for bidx in range(int(bid.count) + 1):
+            # Read BLOCK_INFO
+            binfo = RSRC_INFO(*(unpack('>iiiII', info[binfo_offset:binfo_offset + 20])))
+            entries.append((
+                name,
+                bidx,
+                hdr1.info_offset + bid_offset,
+                hdr1.info_offset + binfo_offset,
+                hdr1.data_offset + binfo.offset
+            ))
+            binfo_offset = binfo_offset + 20
+        bid_offset = bid_offset + 12
+    return entries
+
+
+def iter_blocks(fileobj, names=None):
+    ''' Parses a resource file (vi, ctl, llb) from any binary file-like object in a forward pass.
+    Yields BLOCK in data offset order as they become available, optionally only the named blocks.
+    Seekable streams seek straight to the directory and blocks. Non-seekable streams (pipes, HTTP bodies)
+    only buffer the data section when it precedes the directory, which is the usual layout.
+    Stops reading as soon as every named block was yielded.
+    '''
+    names = None if names is None else set(names)
+    seekable = _is_seekable(fileobj)
+    base = fileobj.tell() if seekable else 0
+
+    # Read RSRC_HEADER_1
+    hdr1 = RSRC_HEADER(*(unpack('>6sH4s4sIIII', _read_exact(fileobj, 32))))
+    logging.debug(hdr1)
+    pos = 32
+
+    data = None
+    if seekable:
+        fileobj.seek(base + hdr1.info_offset)
+    elif hdr1.data_offset < hdr1.info_offset:
+        # Directory comes after the data, keep the data section
+        if hdr1.data_offset < pos or hdr1.data_offset + hdr1.data_size > hdr1.info_offset:
+            raise RSRCException(f'RSRC invalid or corrupt. Data section at offset {hdr1.data_offset} (size {hdr1.data_size}) overlaps the headers.')
+        _skip(fileobj, hdr1.data_offset - pos)
+        data = memoryview(_read_exact(fileobj, hdr1.data_size))
+        pos = hdr1.data_offset + hdr1.data_size
+        _skip(fileobj, hdr1.info_offset - pos)
+    else:
+        if hdr1.info_offset < pos:
+            raise RSRCException(f'RSRC invalid or corrupt. Info section at offset {hdr1.info_offset} overlaps the header.')
+        _skip(fileobj, hdr1.info_offset - pos)
+
+    # Read INFO section (headers + block directory)
+    info = _read_exact(fileobj, hdr1.info_size)
+    pos = hdr1.info_offset + hdr1.info_size
+    entries = sorted(
+        (e for e in _parse_directory(hdr1, info) if names is None or e[0] in names),
+        key=lambda e: e[4]
+    )
+    wanted = None if names is None else len(entries)
+
+    for name, bidx, bid_offset, binfo_offset, bdata_offset in entries:
+        if data is not None:
+            # Read BLOCK_DATA from the buffered data section
+            rel = bdata_offset - hdr1.data_offset
+            _check_range(len(data), rel, 4, f'Block {name}.{bidx} length')
+            blen, = unpack('>I', data[rel:rel + 4])
+            _check_range(len(data), rel + 4, int(blen), f'Block {name}.{bidx} data')
+            bdata = bytes(data[rel + 4:rel + 4 + blen])
+        else:
+            if seekable:
+                if bdata_offset < 0:
+                    raise RSRCException(f'RSRC invalid or corrupt. Block {name}.{bidx} at negative offset {bdata_offset}.')
+                fileobj.seek(base + bdata_offset)
+            else:
+                if bdata_offset < pos:
+                    raise RSRCException(f'RSRC invalid or corrupt. Block {name}.{bidx} overlaps the directory.')
+                _skip(fileobj, bdata_offset - pos)
+            blen, = unpack('>I', _read_exact(fileobj, 4))
+            bdata = _read_exact(fileobj, blen)
+            pos = bdata_offset + 4 + blen
+        yield BLOCK(name, bidx, bdata, bid_offset, binfo_offset, bdata_offset)
+
+        if wanted is not None:
+            wanted = wanted - 1
+            if wanted == 0:
+                return
@@ -0,0 +1,318 @@
+from struct import unpack, error as struct_error
+from collections import namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import argparse
+import logging
+import sqlite3
+import math
+import zlib
+import time
+import re
+import os
+
+from .LVRSRC import RSRC, RSRCException, _decode_text
+from .LVTypes import decode_vctp
+from .LVHeap import iter_heap, HEAP_BLOCKS
+from .LVVersion import iter_rsrc_files
+
+SEARCH_RESULT = namedtuple('SEARCH_RESULT', [
+    'file',
+    'score',
+    'description'
+])
+
+INDEX_STATS = namedtuple('INDEX_STATS', [
+    'files',
+    'terms',
+    'postings'
+])
+
+# Ranking weight per field
+SEARCH_FIELDS = {
+    'filename': 3.0,
+    'description': 2.0,
+    'label': 1.5,
+    'text': 1.0
+}
+
+# Heap tags holding text: 34 = label/string constant text, 25 = object description
+HEAP_TEXT_TAGS = {34: 'text', 25: 'description'}
+
+# Files written per index transaction
+UPDATE_BATCH = 256
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r'\w+')
+_MARKUP = re.compile(r'</?[a-zA-Z][^>]*>')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    file TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    length REAL NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+'''
+
+
+def tokenize(text):
+    ''' Lower case word tokens, markup (<b>, <B>) removed. Paths split on their separators. '''
+    return _TOKEN.findall(_MARKUP.sub(' ', text).lower())
+
+
+def _is_text(b):
+    return all(c >= 0x20 or c in (0x09, 0x0A, 0x0D) for c in b)
+
+
+def extract_text(file):
+    ''' Extracts the searchable strings of a resource file. Returns dict(field, List(text)). '''
+    rsrc = RSRC()
+    rsrc.load(file)
+    texts = {field: [] for field in SEARCH_FIELDS}
+    texts['filename'] = [os.path.basename(file)] + list(rsrc.get_filenames())
+
+    # Read STRG = length | VI description
+    strg = rsrc.get_block_data('STRG')
+    if strg is not None and len(strg) >= 4:
+        length, = unpack('>I', strg[0:4])
+        texts['description'].append(_decode_text(bytes(strg[4:4 + length])))
+
+    # Control labels and enum items
+    vctp = rsrc.get_block_data('VCTP')
+    if vctp is not None:
+        try:
+            for t in decode_vctp(vctp).types:
+                if t.label:
+                    texts['label'].append(t.label)
+                if t.type_name.startswith('Enum'):
+                    texts['label'].extend(t.data)
+        except (RSRCException, zlib.error) as e:
+            logging.debug('%s: %s', file, e)
+
+    # Front panel/block diagram text
+    for name in HEAP_BLOCKS:
+        heap = rsrc.get_block_data(name)
+        if heap is None:
+            continue
+        try:
+            for _, tag, _, content in iter_heap(heap):
+                if tag in HEAP_TEXT_TAGS and content and _is_text(content):
+                    texts[HEAP_TEXT_TAGS[tag]].append(_decode_text(content))
+        except (RSRCException, zlib.error) as e:
+            logging.debug('%s: %s', file, e)
+    return texts
+
+
+def _extract(job):
+    ''' Worker, returns Tuple(file, stamp, dict(term, weight), length, description, error) '''
+    file, stamp = job
+    try:
+        texts = extract_text(file)
+    except (OSError, RSRCException, struct_error, zlib.error) as e:
+        return file, stamp, None, 0, '', str(e)
+    except Exception as e:
+        # Any other failure is still this file's error, raising here would abort the whole update
+        logging.debug('%s: %s', file, e, exc_info=True)
+        return file, stamp, None, 0, '', f'{type(e).__name__}: {e}'
+    weights = Counter()
+    for field, values in texts.items():
+        for text in values:
+            for term in tokenize(text):
+                weights[term] += SEARCH_FIELDS[field]
+    description = ' '.join(_MARKUP.sub('', ' '.join(texts['description'][:1])).split())
+    return file, stamp, dict(weights), sum(weights.values()), description[:200], None
+
+
+def _stamp(file):
+    st = os.stat(file)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class SearchIndex:
+    ''' Persistent inverted index over the descriptions, labels, strings and filenames of resource files.
+    Stored in a sqlite database: one row per file (with its mtime/size stamp) and one posting
+    per (term, file) holding the field weighted term frequency. update() only re-extracts files whose
+    stamp changed, in parallel worker processes, and search() ranks files with BM25 without
+    opening any of them.
+    '''
+    def __init__(self, path):
+        self._path = os.path.abspath(path)
+        self._db = sqlite3.connect(self._path)
+        self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Accessors
+    def get_files(self):
+        return [row[0] for row in self._db.execute('SELECT file FROM docs ORDER BY file')]
+
+    def get_stats(self):
+        files, = self._db.execute('SELECT COUNT(*) FROM docs').fetchone()
+        terms, postings = self._db.execute('SELECT COUNT(DISTINCT term), COUNT(*) FROM postings').fetchone()
+        return INDEX_STATS(files, terms, postings)
+
+    # Functions
+    def update(self, files, workers=None, prune=False):
+        ''' Indexes new and changed files. Indexed files no longer on disk are dropped, with prune
+        also the ones not in files.
+        Returns Tuple(indexed, unchanged, removed, errors) where errors is a List(Tuple(file, error)).
+        '''
+        known = {row[0]: (row[1], row[2]) for row in self._db.execute('SELECT file, mtime_ns, size FROM docs')}
+        jobs = []
+        seen = set()
+        unchanged = 0
+        for file in files:
+            file = os.path.abspath(file)
+            seen.add(file)
+            try:
+                stamp = _stamp(file)
+            except OSError:
+                continue
+            if known.get(file) == stamp:
+                unchanged = unchanged + 1
+            else:
+                jobs.append((file, stamp))
+        removed = [f for f in known if (prune and f not in seen) or not os.path.exists(f)]
+
+        errors = []
+        indexed = 0
+        with self._db:
+            for file in removed:
+                self._delete(file)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Workers extract and tokenize, this process only writes the postings
+            results = executor.map(_extract, jobs, chunksize=16) if jobs else ()
+            # Commit in batches, an interrupted update keeps the files indexed so far
+            for i in range(0, len(jobs), UPDATE_BATCH):
+                with self._db:
+                    for file, stamp, weights, length, description, error in itertools.islice(results, UPDATE_BATCH):
+                        self._delete(file)
+                        if error is not None:
+                            errors.append((file, error))
+                            continue
+                        cur = self._db.execute(
+                            'INSERT INTO docs (file, mtime_ns, size, length, description) VALUES (?, ?, ?, ?, ?)',
+                            (file, stamp[0], stamp[1], length, description)
+                        )
+                        self._db.executemany(
+                            'INSERT INTO postings (term, doc, weight) VALUES (?, ?, ?)',
+                            ((term, cur.lastrowid, weight) for term, weight in weights.items())
+                        )
+                        indexed = indexed + 1
+        return indexed, unchanged, len(removed), errors
+
+    def remove(self, file):
+        with self._db:
+            self._delete(os.path.abspath(file))
+
+    def search(self, query, limit=20):
+        ''' Returns List(SEARCH_RESULT) of the files matching every term of query, best first.
+        The last term also matches as a prefix ("pal" finds "palette").
+        '''
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        count, avg_length = self._db.execute('SELECT COUNT(*), AVG(length) FROM docs').fetchone()
+        if not count:
+            return []
+
+        scores = None
+        for i, term in enumerate(terms):
+            if i == len(terms) - 1:
+                rows = self._db.execute(
+                    'SELECT p.doc, SUM(p.weight), d.length FROM postings p JOIN docs d ON d.id = p.doc '
+                    'WHERE p.term >= ? AND p.term < ? GROUP BY p.doc',
+                    (term, term + '\uffff')
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    'SELECT p.doc, p.weight, d.length FROM postings p JOIN docs d ON d.id = p.doc WHERE p.term = ?',
+                    (term,)
+                ).fetchall()
+            # BM25 term score
+            idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            term_scores = {
+                doc: idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                for doc, tf, length in rows
+            }
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc: score + term_scores[doc] for doc, score in scores.items() if doc in term_scores}
+            if not scores:
+                return []
+
+        best = sorted(scores.items(), key=lambda s: -s[1])[:limit]
+        docs = {}
+        for doc, file, description in self._db.execute(
+            f'SELECT id, file, description FROM docs WHERE id IN ({",".join("?" * len(best))})',
+            [doc for doc, _ in best]
+        ):
+            docs[doc] = (file, description)
+        return [SEARCH_RESULT(docs[doc][0], score, docs[doc][1]) for doc, score in best]
+
+    def close(self):
+        self._db.close()
+
+    def _delete(self, file):
+        row = self._db.execute('SELECT id FROM docs WHERE file = ?', (file,)).fetchone()
+        if row is not None:
+            self._db.execute('DELETE FROM postings WHERE doc = ?', row)
+            self._db.execute('DELETE FROM docs WHERE id = ?', row)
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='Full-text search over LabVIEW descriptions, labels, strings and filenames')
+
+    parser.add_argument('index', help='Index database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('update', help='Index new and changed files')
+    p.add_argument('paths', nargs='+', help='Files or directories')
+    p.add_argument('--prune', action='store_true', help='Drop indexed files not found under paths')
+    p.add_argument('-w', '--workers', type=int, default=None, help='Extraction processes')
+    p = sub.add_parser('search', help='Ranked search')
+    p.add_argument('query', nargs='+')
+    p.add_argument('-n', '--limit', type=int, default=20)
+    sub.add_parser('stats', help='Show index size')
+
+    args = parser.parse_args()
+
+    with SearchIndex(args.index) as index:
+        if args.command == 'update':
+            start = time.perf_counter()
+            indexed, unchanged, removed, errors = index.update(iter_rsrc_files(args.paths), args.workers, args.prune)
+            for file, error in errors:
+                print(f'error {file}: {error}')
+            print(f'indexed {indexed}, unchanged {unchanged}, removed {removed} in {time.perf_counter() - start:.2f}s')
+        elif args.command == 'search':
+            start = time.perf_counter()
+            results = index.search(' '.join(args.query), args.limit)
+            for r in results:
+                print(f'{r.score:6.2f} {r.file}')
+                if r.description:
+                    print(f'       {r.description[:100]}')
+            print(f'{len(results)} results in {(time.perf_counter() - start) * 1000:.1f}ms')
+        elif args.command == 'stats':
+            stats = index.get_stats()
+            print(f'{stats.files} files, {stats.terms} terms, {stats.postings} postings')
+
+
+if __name__ == '__main__':
+    cli()
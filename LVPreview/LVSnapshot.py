@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+import argparse
+import time
+import zlib
+import sys
+import os
+
+from .LVRSRC import RSRC, BLOCK, RSRCException
+
+
+def _readonly(data):
+    ''' Read-only view of a block payload. Writable buffers are copied so the owner cannot change them later. '''
+    view = memoryview(data)
+    if not view.readonly:
+        view = memoryview(bytes(view))
+    return view.toreadonly()
+
+
+class RSRCSnapshot:
+    ''' Immutable view of a parsed resource file (vi, ctl, llb).
+    Every field is set once in __init__, block payloads are read-only memoryviews and
+    the lookup tables are tuples/mapping proxies, so one snapshot can be queried from
+    any number of threads without locks. Accessors match RSRC.
+    '''
+    __slots__ = ('_file', '_header', '_blocks', '_block_index', '_filenames')
+
+    def __init__(self, rsrc):
+        blocks = tuple(
+            BLOCK(b.name, b.index, _readonly(b.data), b.id_offset, b.info_offset, b.data_offset)
+            for b in (rsrc.get_block(name, index) for name, index in rsrc.get_block_names())
+        )
+        index = {}
+        for b in blocks:
+            index.setdefault((b.name, b.index), b)
+        object.__setattr__(self, '_file', rsrc.get_file())
+        object.__setattr__(self, '_header', rsrc.get_header())
+        object.__setattr__(self, '_blocks', blocks)
+        object.__setattr__(self, '_block_index', MappingProxyType(index))
+        object.__setattr__(self, '_filenames', tuple(rsrc.get_filenames()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    # Accessors
+    def get_file(self):
+        return self._file
+
+    def get_header(self):
+        return self._header
+
+    def get_block_names(self):
+        return [(b.name, b.index) for b in self._blocks]
+
+    def get_block(self, name, index=0):
+        return self._block_index.get((name, index))
+
+    def get_block_data(self, name, index=0):
+        b = self._block_index.get((name, index))
+        return None if b is None else b.data
+
+    def get_filenames(self):
+        return self._filenames
+
+
+def load_snapshot(file):
+    ''' Loads a resource file into an RSRCSnapshot. Block payloads are views into one immutable buffer. '''
+    file = os.path.abspath(file)
+    with open(file, mode='rb') as f:
+        data = f.read()
+    rsrc = RSRC()
+    rsrc.loads(memoryview(data), file)
+    return RSRCSnapshot(rsrc)
+
+
+def _read_all(snapshot):
+    ''' Benchmark reader, looks up every block and checksums its payload '''
+    crc = 0
+    for name, index in snapshot.get_block_names():
+        crc = zlib.crc32(snapshot.get_block_data(name, index), crc)
+    return crc
+
+
+def benchmark(file, threads=(1, 2, 4, 8), tasks=2000):
+    ''' Measures reader scaling of one shared snapshot across ThreadPoolExecutor sizes.
+    Returns List(Tuple(threads, seconds, reads per second)).
+    '''
+    snapshot = load_snapshot(file)
+    expected = _read_all(snapshot)
+    results = []
+    for n in threads:
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            start = time.perf_counter()
+            crcs = set(executor.map(lambda _: _read_all(snapshot), range(tasks)))
+            elapsed = time.perf_counter() - start
+        if crcs != {expected}:
+            raise RSRCException(f'Snapshot of {file} changed while being read.')
+        results.append((n, elapsed, tasks / elapsed))
+    return results
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent readers of an immutable RSRC snapshot')
+
+    parser.add_argument('file', help='Resource file to read')
+    parser.add_argument('-t', '--threads', type=int, nargs='+', default=[1, 2, 4, 8], help='Thread counts')
+    parser.add_argument('-n', '--tasks', type=int, default=2000, help='Full reads per thread count')
+
+    args = parser.parse_args()
+
+    # Free-threaded builds (3.13t+) report the GIL as disabled
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'Python {sys.version.split()[0]} GIL {"enabled" if gil else "disabled"}')
+    base = None
+    for n, elapsed, rate in benchmark(args.file, args.threads, args.tasks):
+        base = base or rate
+        print(f'threads={n:<3} {elapsed:8.3f}s {rate:10.0f} reads/s {rate / base:5.2f}x')
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,318 @@
+from collections import namedtuple
+import threading
+import argparse
+import hashlib
+import json
+import time
+import zlib
+import os
+
+from .LVRSRC import RSRC, RSRCException
+from .LVPack import PACK_RAW_BLOCKS
+
+REVISION = namedtuple('REVISION', [
+    'id',
+    'file',
+    'sequence',
+    'mtime',
+    'size',
+    'hash',
+    'skeleton',
+    'blocks'
+])
+
+REVISION_BLOCK = namedtuple('REVISION_BLOCK', [
+    'name',
+    'index',
+    'offset',
+    'length',
+    'hash'
+])
+
+STORE_STATS = namedtuple('STORE_STATS', [
+    'revisions',
+    'objects',
+    'stored_size',
+    'revision_size'
+])
+
+GC_STATS = namedtuple('GC_STATS', [
+    'objects',
+    'size'
+])
+
+# Object codec prefix
+_CODEC_RAW = b'r'
+_CODEC_ZLIB = b'z'
+
+
+def _hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class RSRCStore:
+    ''' Content-addressed revision store for resource files (vi, ctl, llb).
+    Each block payload is stored once under the sha256 of its content in objects/, and a revision
+    is a manifest in revisions/ pointing at a skeleton object (the file with every block payload
+    cut out: headers, directory, block lengths, filenames) plus the block hashes and offsets.
+    Unchanged blocks of a new save cost no I/O. Revisions rebuild byte for byte.
+    A revision belongs to one file and is ordered by its ingest sequence, so identical content
+    saved under two paths, or reverted to later, gets a revision of its own.
+    '''
+    def __init__(self, root, level=6):
+        self._root = os.path.abspath(root)
+        self._level = level
+        self._lock = threading.Lock()
+        self._sequence = 0
+        os.makedirs(os.path.join(self._root, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(self._root, 'revisions'), exist_ok=True)
+        os.makedirs(os.path.join(self._root, 'heads'), exist_ok=True)
+
+    # Accessors
+    def get_revision(self, rev_id):
+        path = self._revision_path(rev_id)
+        if not os.path.exists(path):
+            raise RSRCException(f'Revision {rev_id} not found in store {self._root}.')
+        with open(path, mode='r', encoding='utf-8') as f:
+            r = json.load(f)
+        r['blocks'] = tuple(REVISION_BLOCK(*b) for b in r['blocks'])
+        return REVISION(**r)
+
+    def get_revisions(self, file=None):
+        ''' Returns List(REVISION) in ingest order, optionally only the revisions of file '''
+        file = None if file is None else os.path.abspath(file)
+        revisions = []
+        for entry in os.scandir(os.path.join(self._root, 'revisions')):
+            if not entry.name.endswith('.json'):
+                continue
+            r = self.get_revision(entry.name[:-5])
+            if file is None or r.file == file:
+                revisions.append(r)
+        return sorted(revisions, key=lambda r: r.sequence)
+
+    def get_stats(self):
+        revisions = self.get_revisions()
+        objects = 0
+        stored_size = 0
+        for path in self._iter_objects():
+            objects = objects + 1
+            stored_size = stored_size + os.path.getsize(path)
+        return STORE_STATS(len(revisions), objects, stored_size, sum(r.size for r in revisions))
+
+    # Functions
+    def add(self, file):
+        ''' Stores the current content of file as a revision.
+        Returns the new REVISION, or the latest one of file if its content did not change.
+        '''
+        file = os.path.abspath(file)
+        with open(file, mode='rb') as f:
+            data = f.read()
+        return self.add_bytes(data, file, os.path.getmtime(file))
+
+    def add_bytes(self, data, file=None, mtime=None):
+        file = None if file is None else os.path.abspath(file)
+        content_hash = _hash(data)
+        rsrc = RSRC()
+        rsrc.loads(memoryview(data), file)
+
+        # gc() holds the lock too, it cannot drop an existing object this revision reuses
+        with self._lock:
+            head = self._get_head(file)
+            if head is not None and head.hash == content_hash:
+                return head
+            # Ingest order, strictly increasing even where the clock is coarse (Windows)
+            self._sequence = max(time.time_ns(), self._sequence + 1, head.sequence + 1 if head is not None else 0)
+            rev_id = _hash(f'{file}\0{self._sequence}\0{content_hash}'.encode('utf-8'))
+
+            # Cut block payloads out of the file, overlapping ranges stay in the skeleton
+            blocks = []
+            skeleton = []
+            pos = 0
+            for name, index in sorted(rsrc.get_block_names(), key=lambda b: rsrc.get_block(*b).data_offset):
+                b = rsrc.get_block(name, index)
+                offset = b.data_offset + 4
+                if offset < pos or not len(b.data):
+                    continue
+                skeleton.append(data[pos:offset])
+                blocks.append(REVISION_BLOCK(name, index, offset, len(b.data), self._put(b.data, name)))
+                pos = offset + len(b.data)
+            skeleton.append(data[pos:])
+
+            r = REVISION(
+                rev_id,
+                file,
+                self._sequence,
+                mtime if mtime is not None else time.time(),
+                len(data),
+                content_hash,
+                self._put(b''.join(skeleton)),
+                tuple(blocks)
+            )
+            # Objects first, then the manifest, a revision never points at missing objects
+            self._write(self._revision_path(rev_id), json.dumps(r._asdict()).encode('utf-8'))
+            self._write(self._head_path(file), rev_id.encode('utf-8'))
+        return r
+
+    def reconstruct(self, rev_id):
+        ''' Returns the bytes of a revision '''
+        r = self.get_revision(rev_id)
+        skeleton = self._get(r.skeleton)
+        pieces = []
+        pos = 0
+        skeleton_pos = 0
+        for b in r.blocks:
+            gap = b.offset - pos
+            pieces.append(skeleton[skeleton_pos:skeleton_pos + gap])
+            pieces.append(self._get(b.hash))
+            skeleton_pos = skeleton_pos + gap
+            pos = b.offset + b.length
+        pieces.append(skeleton[skeleton_pos:])
+        data = b''.join(pieces)
+        if len(data) != r.size or _hash(data) != r.hash:
+            raise RSRCException(f'Store invalid or corrupt. Revision {rev_id} failed hash check.')
+        return data
+
+    def checkout(self, rev_id, dest):
+        data = self.reconstruct(rev_id)
+        with open(dest, mode='wb') as f:
+            f.write(data)
+
+    def remove(self, rev_id):
+        ''' Removes a revision manifest. Its objects are freed by gc(). '''
+        with self._lock:
+            r = self.get_revision(rev_id)
+            os.remove(self._revision_path(rev_id))
+            head = self._head_path(r.file)
+            if os.path.exists(head):
+                with open(head, mode='rb') as f:
+                    if f.read().decode('utf-8') != rev_id:
+                        return
+                # The file's history now ends at its previous revision
+                history = self.get_revisions(r.file) if r.file is not None else [x for x in self.get_revisions() if x.file is None]
+                if history:
+                    self._write(head, history[-1].id.encode('utf-8'))
+                else:
+                    os.remove(head)
+
+    def gc(self):
+        ''' Deletes every object no revision references. Returns GC_STATS(objects, size) freed. '''
+        with self._lock:
+            referenced = set()
+            for r in self.get_revisions():
+                referenced.add(r.skeleton)
+                referenced.update(b.hash for b in r.blocks)
+            objects = 0
+            size = 0
+            for path in self._iter_objects():
+                if os.path.basename(path) not in referenced:
+                    size = size + os.path.getsize(path)
+                    objects = objects + 1
+                    os.remove(path)
+            return GC_STATS(objects, size)
+
+    def _object_path(self, h):
+        return os.path.join(self._root, 'objects', h[:2], h)
+
+    def _revision_path(self, rev_id):
+        return os.path.join(self._root, 'revisions', f'{rev_id}.json')
+
+    def _head_path(self, file):
+        ''' Latest revision id of file, so add() never scans the history '''
+        return os.path.join(self._root, 'heads', _hash(str(file).encode('utf-8')))
+
+    def _get_head(self, file):
+        try:
+            with open(self._head_path(file), mode='rb') as f:
+                return self.get_revision(f.read().decode('utf-8'))
+        except (OSError, RSRCException):
+            return None
+
+    def _iter_objects(self):
+        for d in os.scandir(os.path.join(self._root, 'objects')):
+            if d.is_dir():
+                for entry in os.scandir(d.path):
+                    if not entry.name.endswith('.tmp'):
+                        yield entry.path
+
+    def _put(self, data, name=None):
+        ''' Stores data once under its hash, returns the hash '''
+        h = _hash(data)
+        path = self._object_path(h)
+        if os.path.exists(path):
+            return h
+        stored = _CODEC_RAW + bytes(data)
+        if name not in PACK_RAW_BLOCKS:
+            packed = zlib.compress(data, self._level)
+            if len(packed) < len(data):
+                stored = _CODEC_ZLIB + packed
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write(path, stored)
+        return h
+
+    def _get(self, h):
+        with open(self._object_path(h), mode='rb') as f:
+            stored = f.read()
+        data = zlib.decompress(stored[1:]) if stored[:1] == _CODEC_ZLIB else stored[1:]
+        if _hash(data) != h:
+            raise RSRCException(f'Store invalid or corrupt. Object {h} failed hash check.')
+        return data
+
+    def _write(self, path, data):
+        ''' Writes through a temporary file so readers never see a partial object '''
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, mode='wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='Block-level deduplicating revision store for LabVIEW resource files')
+
+    parser.add_argument('store', help='Store directory')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('add', help='Store the current revision of files')
+    p.add_argument('files', nargs='+')
+    p = sub.add_parser('log', help='List revisions')
+    p.add_argument('file', nargs='?')
+    p = sub.add_parser('checkout', help='Write a revision to a file')
+    p.add_argument('id')
+    p.add_argument('dest')
+    p = sub.add_parser('rm', help='Remove a revision')
+    p.add_argument('id')
+    sub.add_parser('gc', help='Delete unreferenced blocks')
+    sub.add_parser('stats', help='Show store size')
+
+    args = parser.parse_args()
+
+    store = RSRCStore(args.store)
+
+    def resolve(prefix):
+        matches = [r.id for r in store.get_revisions() if r.id.startswith(prefix)]
+        if len(matches) != 1:
+            parser.error(f'{len(matches)} revisions match {prefix}')
+        return matches[0]
+
+    if args.command == 'add':
+        for file in args.files:
+            try:
+                r = store.add(file)
+                print(f'{r.id[:12]} {file}')
+            except (OSError, RSRCException) as e:
+                print(f'error {file}: {e}')
+    elif args.command == 'log':
+        for r in store.get_revisions(args.file):
+            print(f'{r.id[:12]} {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r.mtime))} {r.size:>10} {r.file}')
+    elif args.command == 'checkout':
+        store.checkout(resolve(args.id), args.dest)
+    elif args.command == 'rm':
+        store.remove(resolve(args.id))
+    elif args.command == 'gc':
+        stats = store.gc()
+        print(f'removed {stats.objects} objects, {stats.size} bytes')
+    elif args.command == 'stats':
+        stats = store.get_stats()
+        print(f'{stats.revisions} revisions, {stats.revision_size} bytes in {stats.objects} objects, {stats.stored_size} bytes stored')
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,194 @@
+from struct import unpack, unpack_from, error as struct_error
+from collections import namedtuple
+import logging
+import zlib
+
+from .LVRSRC import RSRCException, _decode_text
+
+TYPE = namedtuple('TYPE', [
+    'type_id',
+    'type_name',
+    'flags',
+    'label',
+    'fields',
+    'data'
+])
+
+VCTP = namedtuple('VCTP', [
+    'types',
+    'top_types'
+])
+
+TYPE_NAMES = {
+    0x00: 'Void',
+    0x01: 'I8', 0x02: 'I16', 0x03: 'I32', 0x04: 'I64',
+    0x05: 'U8', 0x06: 'U16', 0x07: 'U32', 0x08: 'U64',
+    0x09: 'SGL', 0x0A: 'DBL', 0x0B: 'EXT',
+    0x0C: 'CSG', 0x0D: 'CDB', 0x0E: 'CXT',
+    0x15: 'EnumU8', 0x16: 'EnumU16', 0x17: 'EnumU32',
+    0x21: 'Boolean',
+    0x30: 'String', 0x32: 'Path', 0x33: 'Picture', 0x37: 'CString',
+    0x40: 'Array',
+    0x50: 'Cluster',
+    0x51: 'Variant',
+    0x53: 'Waveform',
+    0x54: 'MeasureData',
+    0x5F: 'FixedPoint',
+    0x70: 'Refnum',
+    0xF0: 'Function',
+    0xF1: 'TypeDef',
+    0xF2: 'PolyVI'
+}
+
+TYPE_FLAG_LABEL = 0x40
+
+# Global interning table, identical descriptors from any file share one TYPE object
+_types = {}
+
+
+def intern_type(t):
+    ''' Returns the shared instance equal to t. Interned types compare equal by identity. '''
+    return _types.setdefault(t, t)
+
+
+def get_type_count():
+    return len(_types)
+
+
+def clear_types():
+    _types.clear()
+
+
+def _read_pstr(payload, offset, pad=True):
+    ''' Reads a pascal string, returns (text, next offset). Labels are padded to an even length. '''
+    length = payload[offset]
+    text = _decode_text(bytes(payload[offset + 1:offset + 1 + length]))
+    offset = offset + 1 + length
+    if pad and (1 + length) % 2:
+        offset = offset + 1
+    return text, offset
+
+
+def _find_label(payload):
+    ''' Finds the trailing label of a descriptor whose layout is unknown '''
+    end = len(payload)
+    for p in range(end):
+        length = payload[p]
+        if p + 1 + length == end or (p + 2 + length == end and (1 + length) % 2 and payload[end - 1] == 0):
+            return p
+    return None
+
+
+def _split(tid, flags, payload):
+    ''' Splits a descriptor payload into (child indices, data, label) '''
+    children = ()
+    data = ()
+    offset = 0
+    if 0x01 <= tid <= 0x0E or tid == 0x21:
+        # Numeric/Boolean (numerics carry a format byte)
+        offset = 1 if tid != 0x21 and payload else 0
+        data = bytes(payload[:offset])
+    elif 0x15 <= tid <= 0x17:
+        # Enum = count | pstr[count] padded to even | format byte
+        count, = unpack_from('>H', payload, 0)
+        offset = 2
+        names = []
+        for _ in range(count):
+            name, offset = _read_pstr(payload, offset, pad=False)
+            names.append(name)
+        offset = offset + offset % 2 + 1
+        data = tuple(names)
+    elif tid in (0x30, 0x32, 0x37):
+        # String/Path = size (-1 for variable)
+        data = unpack_from('>i', payload, 0)
+        offset = 4
+    elif tid == 0x40:
+        # Array = ndims | size[ndims] | element type
+        ndims, = unpack_from('>H', payload, 0)
+        data = unpack_from(f'>{ndims}i', payload, 2)
+        children = unpack_from('>H', payload, 2 + ndims * 4)
+        offset = 2 + ndims * 4 + 2
+    elif tid == 0x50:
+        # Cluster = count | type[count]
+        count, = unpack_from('>H', payload, 0)
+        children = unpack_from(f'>{count}H', payload, 2)
+        offset = 2 + count * 2
+    else:
+        # Unknown layout, keep the raw bytes in front of the label
+        offset = _find_label(payload) if flags & TYPE_FLAG_LABEL else None
+        offset = len(payload) if offset is None else offset
+        data = bytes(payload[:offset])
+
+    label = None
+    if flags & TYPE_FLAG_LABEL and offset < len(payload):
+        label, _ = _read_pstr(payload, offset)
+    return children, data, label
+
+
+def decode_vctp(block):
+    ''' Decodes a 'VCTP' block into interned TYPE descriptors.
+    Returns VCTP(types, top_types), types by descriptor index and the top level type list.
+    '''
+    if block is None or len(block) < 4:
+        raise RSRCException('VCTP invalid or corrupt. Block is empty.')
+    # LabVIEW 8+ = uncompressed size | zlib stream
+    data = block
+    if len(block) > 4 and block[4] == 0x78:
+        size, = unpack('>I', block[0:4])
+        data = zlib.decompress(bytes(block[4:]))
+        if len(data) != size:
+            raise RSRCException(f'VCTP invalid or corrupt. Inflated size {len(data)} != {size}.')
+    data = memoryview(data)
+
+    try:
+        # Read TYPE_COUNT + descriptors (size | flags | type id | payload)
+        count, = unpack('>I', data[0:4])
+        raw = []
+        offset = 4
+        for i in range(count):
+            size, flags, tid = unpack('>HBB', data[offset:offset + 4])
+            if size < 4 or offset + size > len(data):
+                raise RSRCException(f'VCTP invalid or corrupt. Type {i} size {size} at offset {offset}.')
+            raw.append((tid, flags) + _split(tid, flags, data[offset + 4:offset + size]))
+            offset = offset + size
+
+        # Read TOP_TYPE_COUNT + indices
+        top = ()
+        if offset + 2 <= len(data):
+            tcount, = unpack('>H', data[offset:offset + 2])
+            top = unpack(f'>{tcount}H', data[offset + 2:offset + 2 + tcount * 2])
+    except (struct_error, IndexError) as e:
+        raise RSRCException(f'VCTP invalid or corrupt. {e}')
+
+    types = [None] * len(raw)
+
+    def resolve(i, stack=()):
+        if i >= len(raw):
+            raise RSRCException(f'VCTP invalid or corrupt. Type index {i} out of range.')
+        if types[i] is None:
+            if i in stack:
+                raise RSRCException(f'VCTP invalid or corrupt. Type {i} references itself.')
+            tid, flags, children, tdata, label = raw[i]
+            types[i] = intern_type(TYPE(
+                tid,
+                TYPE_NAMES.get(tid, f'0x{tid:02X}'),
+                flags,
+                label,
+                tuple(resolve(c, stack + (i,)) for c in children),
+                tdata
+            ))
+        return types[i]
+
+    for i in range(len(raw)):
+        resolve(i)
+    logging.debug('VCTP types=%s, interned=%s', len(types), len(_types))
+    return VCTP(tuple(types), tuple(resolve(i) for i in top))
+
+
+def format_type(t, indent=0):
+    ''' Formats a TYPE tree as indented text '''
+    label = f" '{t.label}'" if t.label is not None else ''
+    lines = [f"{'  ' * indent}{t.type_name}{label}"]
+    for f in t.fields:
+        lines.append(format_type(f, indent + 1))
+    return '\n'.join(lines)
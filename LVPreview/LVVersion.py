@@ -0,0 +1,206 @@
+from struct import unpack
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import argparse
+import logging
+import os
+
+from .LVRSRC import RSRC_HEADER, RSRC_INFO, BLOCK_ID, RSRCException
+
+VERSION = namedtuple('VERSION', [
+    'major',
+    'minor',
+    'bugfix',
+    'stage',
+    'build',
+    'text'
+])
+
+VERSION_REPORT = namedtuple('VERSION_REPORT', [
+    'file',
+    'rsrc_type',
+    'saved',
+    'vers',
+    'error'
+])
+
+VERSION_STAGES = {0: 'unknown', 1: 'development', 2: 'alpha', 3: 'beta', 4: 'release'}
+VERSION_STAGE_LETTERS = {'unknown': '?', 'development': 'd', 'alpha': 'a', 'beta': 'b', 'release': 'f'}
+
+# Blocks holding the saved LabVIEW version ('LVSR' starts with the same version word as 'vers')
+VERSION_BLOCKS = ('vers', 'LVSR')
+
+
+def _pread(fd, size, offset, lock=None):
+    ''' Positioned read of size bytes at offset.
+    Falls back to seek/read (serialized by lock) where os.pread is unavailable (Windows).
+    '''
+    if hasattr(os, 'pread'):
+        data = os.pread(fd, size, offset)
+    else:
+        with lock or threading.Lock():
+            os.lseek(fd, offset, os.SEEK_SET)
+            data = os.read(fd, size)
+    if len(data) != size:
+        raise RSRCException(f'RSRC invalid or corrupt. Unexpected end of file at offset {offset}.')
+    return data
+
+
+def decode_version(data):
+    ''' Decodes the version word (and text if present) of a 'vers' or 'LVSR' block.
+    Returns VERSION(major, minor, bugfix, stage, build, text)
+    '''
+    if data is None or len(data) < 4:
+        return None
+    vcode, = unpack('>I', data[0:4])
+    text = ''
+    # vers = version(4) | language(2) | pstr(version text) | pstr(version info)
+    if len(data) > 6:
+        tlength = data[6]
+        text = data[7:7 + tlength].decode('utf-8', errors='replace')
+    return VERSION(
+        ((vcode >> 28) & 0x0F) * 10 + ((vcode >> 24) & 0x0F),
+        (vcode >> 20) & 0x0F,
+        (vcode >> 16) & 0x0F,
+        VERSION_STAGES.get((vcode >> 13) & 0x07, 'unknown'),
+        ((vcode >> 4) & 0x0F) * 10 + (vcode & 0x0F),
+        text
+    )
+
+
+def format_version(ver):
+    if ver is None:
+        return ''
+    return f'{ver.major}.{ver.minor}.{ver.bugfix}{VERSION_STAGE_LETTERS[ver.stage]}{ver.build}'
+
+
+def read_version_blocks(file, names=VERSION_BLOCKS):
+    ''' Reads only the header, block directory and the payloads of the named blocks.
+    The rest of the file is never read, so cost is a few small positioned reads per file.
+    Returns a Tuple(RSRC_HEADER, dict((name, index), data))
+    '''
+    file = os.path.abspath(file)
+    if not os.path.exists(file):
+        raise FileNotFoundError(f'Unable to resolve file path: {file}')
+
+    blocks = {}
+    lock = threading.Lock()
+    fd = os.open(file, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        # Read RSRC_HEADER_1
+        hdr1 = RSRC_HEADER(*unpack('>6sH4s4sIIII', _pread(fd, 32, 0, lock)))
+        # Every read below is bounded by the info/data sections, which must fit in the file
+        fsize = os.fstat(fd).st_size
+        if hdr1.info_offset + hdr1.info_size > fsize or hdr1.data_offset + hdr1.data_size > fsize:
+            raise RSRCException(f'RSRC invalid or corrupt. Info/data sections exceed file size {fsize}.')
+        info_end = hdr1.info_offset + hdr1.info_size
+
+        # Read RSRC_HEADER_2 + BLOCK_INFO_LIST
+        hdr_info = _pread(fd, 52, hdr1.info_offset, lock)
+        hdr2 = RSRC_HEADER(*unpack('>6sH4s4sIIII', hdr_info[0:32]))
+        if hdr1 != hdr2:
+            raise RSRCException(f'RSRC invalid or corrupt. RSRC Headers are not identical at offset {hdr1.info_offset}.')
+        info1 = RSRC_INFO(*unpack('>iiiII', hdr_info[32:52]))
+
+        # Read BLOCK_COUNT + BLOCK_IDs in one read
+        list_offset = hdr1.info_offset + info1.offset
+        block_cnt, = unpack('>I', _pread(fd, 4, list_offset, lock))
+        block_cnt = int(block_cnt) + 1
+        if list_offset + 4 + block_cnt * 12 > info_end:
+            raise RSRCException(f'RSRC invalid or corrupt. Block count exceeds info section {block_cnt}.')
+        bids = _pread(fd, block_cnt * 12, list_offset + 4, lock)
+
+        for i in range(block_cnt):
+            bid = BLOCK_ID(*unpack('>4sII', bids[i * 12:i * 12 + 12]))
+            name = bid.name.decode('utf-8', errors='replace')
+            if name not in names:
+                continue
+
+            # Read BLOCK_INFOs for this id only
+            count = int(bid.count) + 1
+            if list_offset + bid.offset + count * 20 > info_end:
+                raise RSRCException(f'RSRC invalid or corrupt. Block {name} info list exceeds info section.')
+            binfos = _pread(fd, count * 20, list_offset + bid.offset, lock)
+            for bidx in range(count):
+                binfo = RSRC_INFO(*unpack('>iiiII', binfos[bidx * 20:bidx * 20 + 20]))
+
+                # Read BLOCK_DATA_LENGTH + BLOCK_DATA
+                bdata_offset = hdr1.data_offset + binfo.offset
+                if binfo.offset < 0 or bdata_offset + 4 > hdr1.data_offset + hdr1.data_size:
+                    raise RSRCException(f'RSRC invalid or corrupt. Block {name}.{bidx} offset exceeds data section.')
+                blen, = unpack('>I', _pread(fd, 4, bdata_offset, lock))
+                if bdata_offset + 4 + blen > hdr1.data_offset + hdr1.data_size:
+                    raise RSRCException(f'RSRC invalid or corrupt. Block {name}.{bidx} exceeds data section.')
+                blocks[(name, bidx)] = _pread(fd, blen, bdata_offset + 4, lock)
+    finally:
+        os.close(fd)
+    return hdr1, blocks
+
+
+def read_version(file):
+    ''' Reads the saved version of a single resource file (vi, ctl, llb)
+    Returns a VERSION_REPORT(file, rsrc_type, saved, vers, error)
+    '''
+    try:
+        hdr, blocks = read_version_blocks(file)
+    except (OSError, RSRCException) as e:
+        logging.debug('%s: %s', file, e)
+        return VERSION_REPORT(file, '', None, [], str(e))
+
+    vers = [decode_version(data) for (name, _), data in sorted(blocks.items()) if name == 'vers']
+    saved = decode_version(blocks.get(('LVSR', 0))) or next(iter(vers), None)
+    return VERSION_REPORT(
+        file,
+        hdr.rsrc_type.decode('utf-8', errors='replace'),
+        saved,
+        vers,
+        None
+    )
+
+
+def version_report(files, workers=8):
+    ''' Reads the saved version of many resource files concurrently.
+    Yields VERSION_REPORT in the order of files.
+    '''
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(read_version, files)
+
+
+def iter_rsrc_files(paths, exts=('.vi', '.vit', '.ctl', '.ctt', '.llb', '.vim')):
+    ''' Expands directories into resource files (vi, ctl, llb) '''
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for f in sorted(files):
+                    if os.path.splitext(f)[1].lower() in exts:
+                        yield os.path.join(root, f)
+        else:
+            yield path
+
+
+def format_report(rows):
+    ''' Formats VERSION_REPORT rows as a text table '''
+    lines = [f"{'saved':<12} {'type':<5} {'vers':<24} file"]
+    for r in rows:
+        if r.error is not None:
+            lines.append(f"{'error':<12} {'':<5} {r.error:<24} {r.file}")
+            continue
+        vers = ', '.join(sorted({format_version(v) for v in r.vers}))
+        lines.append(f'{format_version(r.saved):<12} {r.rsrc_type:<5} {vers:<24} {r.file}')
+    return '\n'.join(lines)
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='LabVIEW saved version report')
+
+    parser.add_argument('paths', help='Files or directories to scan', nargs='+')
+    parser.add_argument('-j', '--jobs', type=int, default=8, help='Number of concurrent readers')
+
+    args = parser.parse_args()
+
+    print(format_report(version_report(iter_rsrc_files(args.paths), args.jobs)))
+
+
+if __name__ == '__main__':
+    cli()
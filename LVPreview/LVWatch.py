@@ -0,0 +1,352 @@
+from struct import unpack_from, error as struct_error
+from collections import namedtuple
+import threading
+import argparse
+import logging
+import select
+import time
+import sys
+import os
+
+from .LVRSRC import RSRC, RSRCException
+
+WATCH_EVENT = namedtuple('WATCH_EVENT', [
+    'action',
+    'file',
+    'header',
+    'blocks',
+    'filenames',
+    'icons',
+    'error'
+])
+
+WATCH_EXTS = ('.vi', '.vit', '.ctl', '.ctt', '.llb', '.vim')
+
+# Icon blocks pushed to subscribers (1-bit, 4-bit and 8-bit 32x32)
+ICON_BLOCKS = ('ICON', 'icl4', 'icl8')
+
+
+class _PollBackend:
+    ''' Portable fallback. Diffs (mtime, size) snapshots of the tree on every poll. '''
+    def __init__(self, root, exts, interval=1.0):
+        self._root = root
+        self._exts = exts
+        self._interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for root, _, files in os.walk(self._root):
+            for f in files:
+                if os.path.splitext(f)[1].lower() not in self._exts:
+                    continue
+                file = os.path.join(root, f)
+                try:
+                    st = os.stat(file)
+                except OSError:
+                    continue
+                snapshot[file] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def files(self):
+        return list(self._snapshot)
+
+    def poll(self, timeout):
+        ''' Returns Tuple(changed files, removed directories) '''
+        time.sleep(min(timeout, self._interval))
+        snapshot = self._scan()
+        changed = [f for f, st in snapshot.items() if self._snapshot.get(f) != st]
+        changed += [f for f in self._snapshot if f not in snapshot]
+        self._snapshot = snapshot
+        return changed, []
+
+    def close(self):
+        pass
+
+
+class _InotifyBackend:
+    ''' Linux inotify through ctypes. Only changed paths are reported, the tree is only rescanned
+    when the kernel event queue overflowed.
+    '''
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    def __init__(self, root, exts):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._root = root
+        self._exts = exts
+        self._wds = {}
+        self._files = self._watch_tree(root)
+
+    def _watch_tree(self, path):
+        ''' Watches path and every sub directory, returns the resource files found '''
+        found = []
+        for root, _, files in os.walk(path):
+            self._add_watch(root)
+            found += [os.path.join(root, f) for f in files if os.path.splitext(f)[1].lower() in self._exts]
+        return found
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            logging.debug('inotify_add_watch failed for %s', path)
+            return
+        self._wds[wd] = path
+
+    def _rm_watches(self, path):
+        ''' Drops the watches of a directory that left the tree and of its sub directories '''
+        prefix = os.path.join(path, '')
+        for wd, p in list(self._wds.items()):
+            if p == path or p.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._wds[wd]
+
+    def files(self):
+        return self._files
+
+    def poll(self, timeout):
+        ''' Returns Tuple(changed files, removed directories) '''
+        changed = []
+        removed = []
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed, removed
+        buf = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(buf):
+            # Read INOTIFY_EVENT
+            wd, mask, cookie, nlength = unpack_from('iIII', buf, offset)
+            name = buf[offset + 16:offset + 16 + nlength].rstrip(b'\0')
+            offset = offset + 16 + nlength
+
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were lost, rescan: every file on disk and every known file gets re-checked
+                logging.debug('inotify queue overflow, rescanning %s', self._root)
+                changed += self._watch_tree(self._root)
+                removed.append(self._root)
+                continue
+            if mask & self.IN_IGNORED:
+                self._wds.pop(wd, None)
+                continue
+            parent = self._wds.get(wd)
+            if parent is None or not name:
+                continue
+            path = os.path.join(parent, os.fsdecode(name))
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    # Watch new sub directories and pick up files created before the watch existed
+                    changed += self._watch_tree(path)
+                elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                    # Files under a moved/deleted directory get no events of their own
+                    self._rm_watches(path)
+                    removed.append(path)
+                continue
+            changed.append(path)
+        return changed, removed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class RSRCWatcher:
+    ''' Watches a source tree and re-parses only the resource files (vi, ctl, llb) that changed.
+    Rapid saves of the same file are coalesced into one event after debounce seconds of quiet.
+    Subscribers are called from the watcher thread with a WATCH_EVENT.
+    '''
+    def __init__(self, root, exts=WATCH_EXTS, debounce=0.5, poll_interval=1.0, use_inotify=None):
+        self._root = os.path.abspath(root)
+        self._exts = tuple(e.lower() for e in exts)
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+        self._use_inotify = use_inotify
+        self._backend = None
+        self._subscribers = []
+        self._pending = {}
+        self._known = set()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # Accessors
+    def get_root(self):
+        return self._root
+
+    def get_files(self):
+        with self._lock:
+            return sorted(self._known)
+
+    # Functions
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers.remove(callback)
+
+    def start(self, initial_scan=False):
+        ''' Starts the watcher thread.
+        With initial_scan every existing file is parsed once and published as 'created'.
+        '''
+        if self._thread is not None:
+            return
+        self._backend = self._open_backend()
+        files = self._backend.files()
+        if initial_scan:
+            for file in files:
+                self._dispatch(file)
+        else:
+            with self._lock:
+                self._known.update(files)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='RSRCWatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._backend.close()
+        self._backend = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _open_backend(self):
+        if self._use_inotify is not False and sys.platform.startswith('linux'):
+            try:
+                return _InotifyBackend(self._root, self._exts)
+            except (OSError, AttributeError) as e:
+                if self._use_inotify:
+                    raise
+                logging.debug('inotify unavailable, polling instead: %s', e)
+        return _PollBackend(self._root, self._exts, self._poll_interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            timeout = self._poll_interval
+            if self._pending:
+                timeout = max(0.0, min(min(self._pending.values()) - now, timeout))
+
+            try:
+                changed, removed = self._backend.poll(timeout)
+            except Exception:
+                # Keep watching, a failed poll must not end the thread
+                logging.exception('RSRCWatcher failed to poll %s', self._root)
+                self._stop.wait(self._poll_interval)
+                changed, removed = [], []
+            if removed:
+                # Every known file under a removed directory is re-checked (and published as deleted)
+                prefixes = tuple(os.path.join(d, '') for d in removed)
+                with self._lock:
+                    changed = changed + [f for f in self._known if f.startswith(prefixes)]
+
+            for file in changed:
+                if os.path.splitext(file)[1].lower() in self._exts:
+                    # Coalesce: a new change pushes the deadline out again
+                    self._pending[file] = time.monotonic() + self._debounce
+
+            now = time.monotonic()
+            for file in [f for f, deadline in self._pending.items() if deadline <= now]:
+                del self._pending[file]
+                self._dispatch(file)
+
+    def _dispatch(self, file):
+        ''' Parses file and publishes the result. The action is decided from the final state,
+        so create+modify collapses to 'created' and create+delete is dropped.
+        '''
+        exists = os.path.isfile(file)
+        with self._lock:
+            known = file in self._known
+            if exists:
+                self._known.add(file)
+            else:
+                self._known.discard(file)
+        if not exists:
+            if known:
+                self._publish(WATCH_EVENT('deleted', file, None, [], [], {}, None))
+            return
+
+        action = 'modified' if known else 'created'
+        rsrc = RSRC()
+        try:
+            rsrc.load(file)
+        except (OSError, RSRCException, struct_error) as e:
+            logging.debug('%s: %s', file, e)
+            self._publish(WATCH_EVENT(action, file, None, [], [], {}, str(e)))
+            return
+        except Exception as e:
+            # One bad file must never stop the watcher thread
+            logging.exception('RSRCWatcher failed to parse %s', file)
+            self._publish(WATCH_EVENT(action, file, None, [], [], {}, f'{type(e).__name__}: {e}'))
+            return
+        icons = {name: rsrc.get_block_data(name) for name in ICON_BLOCKS if rsrc.get_block(name) is not None}
+        self._publish(WATCH_EVENT(
+            action,
+            file,
+            rsrc.get_header(),
+            rsrc.get_block_names(),
+            rsrc.get_filenames(),
+            icons,
+            None
+        ))
+
+    def _publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                logging.exception('RSRCWatcher subscriber failed for %s', event.file)
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='Watch a LabVIEW source tree for changes')
+
+    parser.add_argument('root', help='Directory to watch')
+    parser.add_argument('-d', '--debounce', type=float, default=0.5, help='Seconds of quiet before re-parsing')
+    parser.add_argument('--poll', action='store_true', help='Force the polling backend')
+
+    args = parser.parse_args()
+
+    def show(event):
+        blocks = ' '.join(f'{n}.{i}' for n, i in event.blocks)
+        print(f"{event.action:<8} {event.file} {event.error or blocks}")
+
+    watcher = RSRCWatcher(args.root, debounce=args.debounce, use_inotify=False if args.poll else None)
+    watcher.subscribe(show)
+    with watcher:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,169 @@
+from struct import unpack, error as struct_error
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import logging
+import zipfile
+import mmap
+import zlib
+import os
+
+from .LVRSRC import RSRC, RSRCException
+
+ZIP_SCAN = namedtuple('ZIP_SCAN', [
+    'archive',
+    'member',
+    'result',
+    'error'
+])
+
+RSRC_SUMMARY = namedtuple('RSRC_SUMMARY', [
+    'rsrc_type',
+    'blocks',
+    'filenames'
+])
+
+ZIP_EXTS = ('.vi', '.vit', '.ctl', '.ctt', '.llb', '.vim')
+
+
+def summarize(rsrc):
+    ''' Default scan function. Keeps only small metadata so member buffers can be released. '''
+    return RSRC_SUMMARY(
+        rsrc.get_header().rsrc_type.decode('utf-8', errors='replace'),
+        rsrc.get_block_names(),
+        rsrc.get_filenames()
+    )
+
+
+def _stored_view(mm, zi):
+    ''' Zero-copy view of a stored (uncompressed) member inside the mapped archive '''
+    # Read LOCAL_FILE_HEADER (30 bytes) for the variable name/extra lengths
+    if mm[zi.header_offset:zi.header_offset + 4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f'Bad local file header for {zi.filename}')
+    nlength, elength = unpack('<HH', mm[zi.header_offset + 26:zi.header_offset + 30])
+    offset = zi.header_offset + 30 + nlength + elength
+    view = memoryview(mm)[offset:offset + zi.file_size]
+    # Same check zipfile does on read
+    if len(view) != zi.file_size or zlib.crc32(view) != zi.CRC:
+        raise zipfile.BadZipFile(f'Bad CRC-32 for file {zi.filename}')
+    return view
+
+
+def _scan_member(archive, zf, mm, zi, func):
+    try:
+        if mm is not None and zi.compress_type == zipfile.ZIP_STORED and not zi.flag_bits & 0x1:
+            buf = _stored_view(mm, zi)
+        else:
+            buf = zf.read(zi)
+        rsrc = RSRC()
+        rsrc.loads(buf, f'{archive}/{zi.filename}')
+        return ZIP_SCAN(archive, zi.filename, func(rsrc), None)
+    except (OSError, RSRCException, struct_error, zipfile.BadZipFile, zlib.error, RuntimeError, UnicodeDecodeError) as e:
+        # RuntimeError covers encrypted members, NotImplementedError unsupported methods (Deflate64)
+        logging.debug('%s/%s: %s', archive, zi.filename, e)
+        return ZIP_SCAN(archive, zi.filename, None, str(e))
+    except Exception as e:
+        # Any other failure (including func) is still this member's error, never the whole scan's
+        logging.debug('%s/%s: %s', archive, zi.filename, e, exc_info=True)
+        return ZIP_SCAN(archive, zi.filename, None, f'{type(e).__name__}: {e}')
+
+
+def _open_archive(archive):
+    ''' Opens archive for member reads and maps it for zero-copy access to stored members '''
+    zf = zipfile.ZipFile(archive)
+    mm = None
+    try:
+        with open(archive, mode='rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        logging.debug('Unable to map %s: %s', archive, e)
+    return zf, mm
+
+
+def _close_archive(entry):
+    archive, zf, mm, _, _ = entry
+    if zf is not None:
+        zf.close()
+    if mm is not None:
+        try:
+            mm.close()
+        except BufferError:
+            # A result still holds a view into the mapping, the garbage collector unmaps it later
+            logging.debug('Mapping of %s is still in use', archive)
+
+
+def _results(entry):
+    archive, _, _, futures, error = entry
+    if error is not None:
+        yield ZIP_SCAN(archive, None, None, error)
+    for future in futures:
+        yield future.result()
+
+
+def _members(zf, exts):
+    return [zi for zi in zf.infolist() if not zi.is_dir() and os.path.splitext(zi.filename)[1].lower() in exts]
+
+
+def scan_archives(archives, func=summarize, workers=8, exts=ZIP_EXTS, max_open=None):
+    ''' Parses the resource files (vi, ctl, llb) inside zip archives without extracting them.
+    Stored members are parsed straight from the mapped archive, deflated members are
+    inflated in memory. Members of all archives are spread across workers.
+    func(rsrc) is called in the worker while the member buffer is alive.
+    At most max_open archives (default workers) are open at once, each one is closed as soon
+    as its results are yielded. An archive that cannot be opened yields one ZIP_SCAN with member None.
+    Yields ZIP_SCAN(archive, member, result, error) in archive/member order.
+    '''
+    max_open = max(1, max_open or workers)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    # Entry = (archive, zipfile, mmap, futures, error), oldest first
+    opened = deque()
+    try:
+        for archive in archives:
+            archive = os.path.abspath(archive)
+            while len(opened) >= max_open:
+                yield from _results(opened[0])
+                _close_archive(opened.popleft())
+            try:
+                zf, mm = _open_archive(archive)
+            except (OSError, zipfile.BadZipFile) as e:
+                logging.debug('%s: %s', archive, e)
+                opened.append((archive, None, None, [], str(e)))
+                continue
+            opened.append((archive, zf, mm, [], None))
+            opened[-1][3].extend(executor.submit(_scan_member, archive, zf, mm, zi, func) for zi in _members(zf, exts))
+
+        while opened:
+            yield from _results(opened[0])
+            _close_archive(opened.popleft())
+    finally:
+        # Closed early: drop queued members and wait for running ones before closing their archives
+        for entry in opened:
+            for future in entry[3]:
+                future.cancel()
+        executor.shutdown(wait=True)
+        while opened:
+            _close_archive(opened.popleft())
+
+
+def scan_zip(archive, func=summarize, workers=8, exts=ZIP_EXTS):
+    ''' Parses the resource files (vi, ctl, llb) inside a single zip archive '''
+    yield from scan_archives([archive], func, workers, exts)
+
+
+def cli():
+    parser = argparse.ArgumentParser(description='List LabVIEW resource files inside zip archives')
+
+    parser.add_argument('archives', help='Zip archives to scan', nargs='+')
+    parser.add_argument('-j', '--jobs', type=int, default=8, help='Number of concurrent workers')
+
+    args = parser.parse_args()
+
+    for scan in scan_archives(args.archives, workers=args.jobs):
+        if scan.error is not None:
+            print(f'error  {scan.archive}:{scan.member} {scan.error}')
+            continue
+        print(f'{scan.result.rsrc_type:<5}  {scan.archive}:{scan.member} blocks:{len(scan.result.blocks)}')
+
+
+if __name__ == '__main__':
+    cli()
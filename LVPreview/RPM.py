@@ -90,6 +90,20 @@ class RSRC_Block:
             f"info@{self.info_offset:<7} | data@{self.data_offset:<7}\n"
 
 
+def _check_range(size, offset, length, what):
+    ''' Validates offset/length against the buffer size before slicing '''
+    if offset < 0 or length < 0 or offset + length > size:
+        raise RSRC_Error(f'RSRC invalid or corrupt. {what} at offset {offset} (size {length}) exceeds file size {size}.')
+
+
+def _decode_text(b):
+    ''' Text is saved in the system code page, most often Windows-1252 '''
+    try:
+        return b.decode('utf-8')
+    except UnicodeDecodeError:
+        return b.decode('cp1252', errors='replace')
+
+
 class RSRC:
     def __init__(self, file=None):
         self.file : str = None
@@ -129,6 +143,7 @@ class RSRC:
         rsrc = b''
         with open(self.file, mode='rb') as f:
             rsrc = f.read()
+        rsize = len(rsrc)
         
         RSRC_HEADER = namedtuple('RSRC_HEADER', [
             'rsrc_id',
@@ -156,6 +171,7 @@ class RSRC:
         ])
 
         # Read RSRC_HEADER_1
+        _check_range(rsize, 0, 32, 'RSRC header')
         hdr1 = RSRC_HEADER(*(unpack('>6sH4s4sIIII', rsrc[
             0:
             32
@@ -163,6 +179,7 @@ class RSRC:
         logging.debug(hdr1)
         
         # Read RSRC_HEADER_2
+        _check_range(rsize, hdr1.info_offset, 32 + 20, 'RSRC info header')
         hdr2 = RSRC_HEADER(*(unpack('>6sH4s4sIIII', rsrc[
                 hdr1.info_offset :
                 hdr1.info_offset + 32
@@ -173,8 +190,8 @@ class RSRC:
             raise RSRC_Error(f'RSRC invalid or corrupt. RSRC Headers are not identical at offset {hdr1.info_offset}.')
         
         self.header = RSRC_Header(
-            hdr1.rsrc_type.decode('utf-8'),
-            hdr1.rsrc_creator.decode('utf-8'),
+            _decode_text(hdr1.rsrc_type),
+            _decode_text(hdr1.rsrc_creator),
             int(hdr1.info_offset)
         )
 
@@ -186,17 +203,19 @@ class RSRC:
         logging.debug(info1)
 
         # Read BLOCK_COUNT
+        _check_range(rsize, hdr1.info_offset + info1.offset, 4, 'Block count')
         block_cnt, = unpack('>I', rsrc[
             hdr1.info_offset + info1.offset : 
             hdr1.info_offset + info1.offset + 4
         ])
         block_cnt = int(block_cnt) + 1
         logging.debug('block_cnt=%s', block_cnt)
-        if block_cnt > 1000:
-            raise RSRC_Error(f'RSRC invalid or corrupt. Block count limit exceeded {block_cnt}.')
+        # The BLOCK_ID list must fit in the file, bounding the work by the real content
+        _check_range(rsize, hdr1.info_offset + info1.offset + 4, block_cnt * 12, f'Block list of {block_cnt} blocks')
 
         # Read BLOCKs
         fnames_offset = 0
+        info_cnt = 0
         bid_offset = hdr1.info_offset + info1.offset + 4
         
         for i in range(block_cnt):
@@ -208,8 +227,14 @@ class RSRC:
                 bid_offset + 12
             ])))
             logging.debug(bid)
+            name = _decode_text(bid.name)
             
             binfo_offset = hdr1.info_offset + info1.offset + bid.offset
+            _check_range(rsize, binfo_offset, (int(bid.count) + 1) * 20, f'Block {name} info list')
+            # BLOCK_INFOs never share bytes, more of them than fit in the file means overlapping lists
+            info_cnt = info_cnt + int(bid.count) + 1
+            if info_cnt * 20 > rsize:
+                raise RSRC_Error(f'RSRC invalid or corrupt. Block info count {info_cnt} exceeds file size {rsize}.')
 
             for bidx in range(int(bid.count) + 1):
                 logging.debug('   BLOCK %s INDEX %s', i, bidx)
@@ -223,18 +248,20 @@ class RSRC:
                 
                 # Read BLOCK_DATA_LENGTH
                 bdata_offset = hdr1.data_offset + binfo.offset
+                _check_range(rsize, bdata_offset, 4, f'Block {name}.{bidx} length')
                 blen, = unpack('>I', rsrc[
                     bdata_offset :
                     bdata_offset + 4
                 ])
                 logging.debug('block_length=%s', blen)
+                _check_range(rsize, bdata_offset + 4, int(blen), f'Block {name}.{bidx} data')
 
                 # Append block
                 self.blocks.append(
                     # Read BLOCK_DATA
                     RSRC_Block(
                         file,
-                        bid.name.decode('utf-8'),
+                        name,
                         rsrc[
                             bdata_offset + 4 :
                             bdata_offset + 4 + int(blen)
@@ -260,7 +287,7 @@ class RSRC:
             bid_offset = bid_offset + 12
             
         # Read filenames at end
-        fremaining = len(rsrc[fnames_offset:])
+        fremaining = max(0, rsize - fnames_offset)
         logging.debug('fnames_offset=%s, fnames_remaining=%s', fnames_offset, fremaining)
         foffset = 0
         
@@ -272,6 +299,7 @@ class RSRC:
             ])
             
             # Read FILENAME
+            _check_range(rsize, fnames_offset + foffset + 1, flength, 'Filename')
             fname, = unpack(f'{flength}s', rsrc[
                 fnames_offset + foffset + 1 :
                 fnames_offset + foffset + 1 + flength
@@ -280,7 +308,7 @@ class RSRC:
 
             # Append filename
             self.filenames.append(
-                fname.decode('utf-8')
+                _decode_text(fname)
             )
         logging.debug(self.filenames)
 